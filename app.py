@@ -1,14 +1,45 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session
-import joblib, requests, pandas as pd, sqlite3, os
+import joblib, requests, pandas as pd, sqlite3, os, time
 from dotenv import load_dotenv
 from flask_bcrypt import Bcrypt
+from gazetteer import Gazetteer, grid_cell
+from hashing import HashPool, HashPoolBusy, RateLimiter
 
 load_dotenv()
 
 app = Flask(__name__)
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
 bcrypt = Bcrypt(app)
 app.secret_key = os.getenv("SECRET_KEY")
 
+# TRUST_PROXY=1: trust one X-Forwarded-For hop (Render's proxy), so remote_addr
+# is the client IP the auth rate limiter keys on. Left off by default, since the
+# header can be forged when the app is reached directly.
+if os.getenv("TRUST_PROXY"):
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+elif os.getenv("RENDER") or os.getenv("PORT"):
+    app.logger.warning("TRUST_PROXY is unset behind a hosting proxy: the per-IP auth "
+                       "rate limit is keyed on the proxy address and shared by all users")
+
+# Password hashing gets fewer slots than there are request threads (WEB_THREADS,
+# which the Procfile passes to gunicorn), so auth bursts can't occupy them all.
+# The pool and rate limiter are per gunicorn worker process.
+WEB_THREADS = int(os.getenv("WEB_THREADS", 8))
+if WEB_THREADS < 2:
+    app.logger.warning("WEB_THREADS=%s: password hashing can block every request thread", WEB_THREADS)
+hash_pool = HashPool(
+    bcrypt,
+    request_threads=WEB_THREADS,
+    workers=int(os.getenv("HASH_WORKERS", 2)),
+    queue_size=int(os.getenv("HASH_QUEUE_SIZE", 1)),
+    timeout=float(os.getenv("HASH_TIMEOUT", 2)),
+)
+auth_limiter = RateLimiter(
+    limit=int(os.getenv("AUTH_RATE_LIMIT", 10)),
+    window=int(os.getenv("AUTH_RATE_WINDOW", 60)),
+)
+
 DB = "users.db"
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
@@ -37,11 +68,37 @@ init_db()
 flood_model = joblib.load("models/flood_model.pkl")
 cyclone_model = joblib.load("models/cyclone_model.pkl")
 
+# -----------------------------
+# Local gazetteer + weather cache
+# -----------------------------
+gazetteer = Gazetteer("data/india_places.csv")
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", 600))
+weather_cache = {}  # grid cell -> (fetched_at, weather)
+
 # -----------------------------
 # Helper functions
 # -----------------------------
-def get_live_weather(city):
+def get_live_weather(city, place=None):
+    # Known places (from the gazetteer) are fetched by coordinates, cached per grid cell
+    if place:
+        return get_weather_by_coords(place["lat"], place["lon"])
     url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={API_KEY}&units=metric"
+    return fetch_weather(url)
+
+def get_weather_by_coords(lat, lon):
+    cell = grid_cell(lat, lon)
+    cached = weather_cache.get(cell)
+    if cached and time.time() - cached[0] < WEATHER_CACHE_TTL:
+        return dict(cached[1], lat=lat, lon=lon)
+    url = f"https://api.openweathermap.org/data/2.5/weather?lat={cell[0]}&lon={cell[1]}&appid={API_KEY}&units=metric"
+    weather = fetch_weather(url)
+    if not weather:
+        return None
+    weather_cache[cell] = (time.time(), weather)
+    # Report the place itself, not the cell centre the weather was fetched for
+    return dict(weather, lat=lat, lon=lon)
+
+def fetch_weather(url):
     r = requests.get(url)
     if r.status_code != 200:
         return None
@@ -70,6 +127,8 @@ def home():
 @app.route('/login', methods=['GET','POST'])
 def login():
     if request.method == 'POST':
+        if not auth_limiter.allow(request.remote_addr):
+            return render_template('login.html', error="Too many attempts, please wait a minute"), 429
         email = request.form['email']
         password = request.form['password']
         conn = sqlite3.connect(DB)
@@ -77,7 +136,11 @@ def login():
         c.execute("SELECT * FROM users WHERE email=?", (email,))
         user = c.fetchone()
         conn.close()
-        if user and bcrypt.check_password_hash(user[3], password):
+        try:
+            valid = bool(user) and hash_pool.check(user[3], password)
+        except HashPoolBusy:
+            return render_template('login.html', error="Server busy, please try again"), 503
+        if valid:
             session['user'] = user[1]
             session['email'] = user[2]
             # Redirect admin email to admin page
@@ -91,9 +154,14 @@ def login():
 @app.route('/register', methods=['GET','POST'])
 def register():
     if request.method == 'POST':
+        if not auth_limiter.allow(request.remote_addr):
+            return render_template('register.html', error="Too many attempts, please wait a minute"), 429
         name = request.form['name']
         email = request.form['email']
-        password = bcrypt.generate_password_hash(request.form['password']).decode('utf-8')
+        try:
+            password = hash_pool.generate(request.form['password'])
+        except HashPoolBusy:
+            return render_template('register.html', error="Server busy, please try again"), 503
         conn = sqlite3.connect(DB)
         c = conn.cursor()
         try:
@@ -135,6 +203,12 @@ def admin_page():
     conn.close()
     return render_template('admin.html', users=users, total_users=total_users, monthly_users=monthly_users)
 
+@app.route('/admin/hash_stats')
+def hash_stats():
+    if 'user' not in session or session.get('email') != 'admin@example.com':
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(hash_pool.stats())
+
 @app.route('/delete_user/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     if 'user' not in session or session.get('email') != 'admin@example.com':
@@ -163,23 +237,36 @@ def dashboard():
 
 
 
+# -----------------------------
+# City autocomplete API
+# -----------------------------
+@app.route('/cities')
+def cities():
+    prefix = request.args.get("prefix", "")
+    limit = min(request.args.get("limit", 10, type=int), 50)
+    return jsonify(gazetteer.complete(prefix, limit))
+
 # -----------------------------
 # Prediction API
 # -----------------------------
 @app.route('/predict', methods=['POST'])
 def predict():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     city = data.get("city")
-    weather = get_live_weather(city)
+    if not isinstance(city, str) or not city.strip():
+        return jsonify({"error": "City not found"})
+    place = gazetteer.resolve(city)
+    weather = get_live_weather(city, place)
     if not weather:
         return jsonify({"error": "City not found"})
+    city = place["name"] if place else city.capitalize()
 
     # Simple live model inference (replace with real model if needed)
     flood_prob = round((weather["humidity"]/100) * (weather["rainfall"]/10 + 0.3), 2)
     cyclone_prob = round((weather["temp"]/40) * (weather["pressure"]/1000 + 0.2), 2)
 
     result = {
-        "city": city.capitalize(),
+        "city": city,
         "weather": weather,
         "flood_prob": flood_prob,
         "flood_risk": risk_level(flood_prob),
@@ -0,0 +1,341 @@
+# =====================================================
+# Bulk Flood & Cyclone Scoring
+# (Streaming chunks + process pool + resumable output)
+# =====================================================
+#
+# Usage:
+#   python bulk_predict.py points.csv scores.jsonl
+#   python bulk_predict.py points.jsonl scores_parquet --format parquet --workers 8
+#   python bulk_predict.py points.csv scores.jsonl --resume
+#
+# Each input record carries the same fields as the live weather dict:
+#   lat, lon, temp, humidity, pressure, rainfall  (optional: elevation)
+# Any other columns (station id, grid cell, ...) are passed through to the output.
+# Rows with missing or non-numeric weather values get null predictions and an
+# `error` field instead of stopping the run.
+
+import argparse, json, os, sys, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+WEATHER_COLUMNS = ["lat", "lon", "temp", "humidity", "pressure", "rainfall"]
+
+# Populated once per worker process by init_worker()
+_flood_model = None
+_cyclone_model = None
+_flood_data = None
+_flood_tree = None
+_cyclone_data = None
+_cyclone_lats = None
+
+# -----------------------------
+# 1️⃣ Worker setup
+# -----------------------------
+def init_worker(models_dir, data_dir):
+    """Load models, datasets and nearest-neighbour indexes once per process."""
+    global _flood_model, _cyclone_model, _flood_data, _flood_tree, _cyclone_data, _cyclone_lats
+    from sklearn.neighbors import BallTree
+
+    _flood_model = joblib.load(os.path.join(models_dir, "flood_model.pkl"))
+    _cyclone_model = joblib.load(os.path.join(models_dir, "cyclone_model.pkl"))
+
+    _flood_data = pd.read_csv(os.path.join(data_dir, "flood_risk_dataset_india.csv")).reset_index(drop=True)
+    coords = np.radians(_flood_data[["Latitude", "Longitude"]].to_numpy(dtype=float))
+    _flood_tree = BallTree(coords, metric="haversine")
+
+    # Cyclone dataset has no Longitude, so nearest is by Latitude only (sorted for bisect)
+    _cyclone_data = pd.read_csv(os.path.join(data_dir, "cyclone_dataset.csv"))
+    _cyclone_data = _cyclone_data.sort_values("Latitude", kind="stable").reset_index(drop=True)
+    _cyclone_lats = _cyclone_data["Latitude"].to_numpy(dtype=float)
+
+# -----------------------------
+# 2️⃣ Vectorised nearest lookups
+# -----------------------------
+def nearest_flood_rows(lat, lon):
+    points = np.radians(np.column_stack([lat, lon]))
+    _, idx = _flood_tree.query(points, k=1)
+    return _flood_data.iloc[idx[:, 0]].reset_index(drop=True)
+
+def nearest_cyclone_rows(lat):
+    right = np.clip(np.searchsorted(_cyclone_lats, lat), 1, len(_cyclone_lats) - 1)
+    left = right - 1
+    pick_left = np.abs(_cyclone_lats[left] - lat) <= np.abs(_cyclone_lats[right] - lat)
+    idx = np.where(pick_left, left, right)
+    return _cyclone_data.iloc[idx].reset_index(drop=True)
+
+# -----------------------------
+# 3️⃣ Feature assembly (same column mapping as utils.prepare_*_features)
+# -----------------------------
+def prepare_flood_features(chunk):
+    nearest = nearest_flood_rows(chunk["lat"].to_numpy(dtype=float), chunk["lon"].to_numpy(dtype=float))
+    features = {}
+    for col in _flood_model.feature_names_in_:
+        if col == 'Rainfall (mm)': features[col] = chunk["rainfall"].to_numpy()
+        elif col == 'Temperature (°C)': features[col] = chunk["temp"].to_numpy()
+        elif col == 'Humidity (%)': features[col] = chunk["humidity"].to_numpy()
+        elif col == 'Elevation (m)':
+            features[col] = pd.to_numeric(chunk["elevation"], errors="coerce").fillna(0).to_numpy() if "elevation" in chunk else 0
+        else: features[col] = nearest[col].to_numpy()
+    return pd.DataFrame(features, columns=_flood_model.feature_names_in_, index=range(len(chunk)))
+
+def prepare_cyclone_features(chunk):
+    nearest = nearest_cyclone_rows(chunk["lat"].to_numpy(dtype=float))
+    features = {}
+    for col in _cyclone_model.feature_names_in_:
+        if col in ['Atmospheric_Pressure', 'Pressure', 'Pressure (hPa)']: features[col] = chunk["pressure"].to_numpy()
+        elif col in ['Humidity', 'Humidity (%)']: features[col] = chunk["humidity"].to_numpy()
+        elif col in ['Sea_Surface_Temperature', 'Sea_Surface_Temperature (°C)']: features[col] = nearest['Sea_Surface_Temperature'].to_numpy()
+        else: features[col] = nearest[col].to_numpy()
+    return pd.DataFrame(features, columns=_cyclone_model.feature_names_in_, index=range(len(chunk)))
+
+def risk_level(prob):
+    if prob < 0.4: return "Low"
+    elif prob < 0.7: return "Medium"
+    else: return "High"
+
+def validate_chunk(chunk):
+    """Coerce the weather columns to numbers; return an error message per row (None if valid)."""
+    bad = pd.DataFrame(index=chunk.index)
+    for col in WEATHER_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors="coerce").astype(float)
+        bad[col] = ~np.isfinite(chunk[col])
+    bad["lat"] |= ~chunk["lat"].between(-90, 90)
+    bad["lon"] |= ~chunk["lon"].between(-180, 180)
+    errors = pd.Series(None, index=chunk.index, dtype=object)
+    failed = bad.any(axis=1)
+    if failed.any():
+        errors[failed] = bad[failed].apply(lambda row: "invalid " + ", ".join(row.index[row.to_numpy()]), axis=1)
+    return errors
+
+def score_chunk(chunk_no, chunk):
+    """Run both forests over one chunk and return it with the prediction columns appended.
+
+    Rows with missing or non-numeric weather values are kept with null
+    predictions and an `error` message instead of failing the chunk.
+    """
+    chunk = chunk.reset_index(drop=True)
+    errors = validate_chunk(chunk)
+    ok = errors.isna().to_numpy()
+    flood_prob = np.full(len(chunk), np.nan)
+    cyclone_prob = np.full(len(chunk), np.nan)
+    if ok.any():
+        good = chunk[ok].reset_index(drop=True)
+        flood_prob[ok] = _flood_model.predict_proba(prepare_flood_features(good))[:, 1]
+        cyclone_prob[ok] = _cyclone_model.predict_proba(prepare_cyclone_features(good))[:, 1]
+    chunk["flood_prob"] = flood_prob.round(4)
+    chunk["flood_risk"] = [risk_level(p) if valid else None for p, valid in zip(flood_prob, ok)]
+    chunk["cyclone_prob"] = cyclone_prob.round(4)
+    chunk["cyclone_risk"] = [risk_level(p) if valid else None for p, valid in zip(cyclone_prob, ok)]
+    chunk["error"] = errors
+    return chunk_no, chunk, int((~ok).sum())
+
+# -----------------------------
+# 4️⃣ Streaming input
+# -----------------------------
+def read_chunks(path, chunk_size, skip_rows=0, first_chunk=0):
+    """Yield (chunk_no, DataFrame); on resume the already-scored rows are skipped unparsed."""
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as source:
+            skipped = 0
+            while skipped < skip_rows:
+                line = source.readline()
+                if not line:
+                    break
+                if line.strip():  # blank lines aren't records
+                    skipped += 1
+            yield from validate_columns(pd.read_json(source, lines=True, chunksize=chunk_size), first_chunk)
+    else:
+        # A callable keeps the header (line 0) without building a set of skipped line numbers
+        skip = (lambda i: 0 < i <= skip_rows) if skip_rows else None
+        yield from validate_columns(pd.read_csv(path, chunksize=chunk_size, skiprows=skip), first_chunk)
+
+def validate_columns(reader, first_chunk):
+    for chunk_no, chunk in enumerate(reader, start=first_chunk):
+        missing = [c for c in WEATHER_COLUMNS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing required columns: {missing}")
+        yield chunk_no, chunk
+
+# -----------------------------
+# 5️⃣ Output writers + checkpoint
+# -----------------------------
+class JsonlWriter:
+    """Appends chunks to a single JSONL file; resume truncates back to the last checkpointed byte."""
+    def __init__(self, path, state):
+        self.path = path
+        offset = state["offset"]
+        if offset and (not os.path.exists(path) or os.path.getsize(path) < offset):
+            # Seeking past the end would pad the file with NUL bytes
+            raise ValueError(f"Cannot resume: {path} is missing or shorter than the checkpointed {offset} bytes")
+        self.fh = open(path, "r+b" if offset else "wb")
+        self.fh.seek(offset)
+        self.fh.truncate()
+
+    def write(self, chunk_no, df):
+        if not df.empty:
+            # Older pandas omits the trailing newline with lines=True
+            text = df.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n"
+            self.fh.write(text.encode("utf-8"))
+        self.fh.flush()
+        os.fsync(self.fh.fileno())
+        return self.fh.tell()
+
+    def close(self):
+        self.fh.close()
+
+class ParquetWriter:
+    """Writes one part file per chunk into a directory, so memory stays bounded by chunk size.
+
+    Chunk dtypes are inferred separately (an int id column turns float when a
+    value is blank), so every part is cast to the schema of the first one.
+    """
+    def __init__(self, path, state):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.schema = None
+        os.makedirs(path, exist_ok=True)
+        # Parts past the checkpoint (all of them on a fresh run) are stale output
+        # from an earlier run and would be read back as duplicate rows
+        for name in os.listdir(path):
+            stale = name.endswith(".tmp")
+            number = name[len("part-"):-len(".parquet")]
+            if name.startswith("part-") and name.endswith(".parquet") and number.isdigit():
+                stale = int(number) >= state["chunks_done"]
+            if stale:
+                os.remove(os.path.join(path, name))
+        if state["chunks_done"]:
+            first = self.part_path(0)
+            if not os.path.exists(first):
+                raise ValueError(f"Cannot resume: {first} is missing")
+            self.schema = pq.read_schema(first).remove_metadata()
+
+    def part_path(self, chunk_no):
+        return os.path.join(self.path, f"part-{chunk_no:06d}.parquet")
+
+    def write(self, chunk_no, df):
+        pa = self.pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.schema is None:
+            # An all-null column in the first chunk has no type yet; store it as string
+            self.schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                     for f in table.schema])
+        try:
+            table = table.cast(self.schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as e:
+            raise ValueError(f"Chunk {chunk_no} does not match the output schema of chunk 0: {e}")
+        part = self.part_path(chunk_no)
+        tmp = part + ".tmp"
+        self.pq.write_table(table, tmp)
+        os.replace(tmp, part)
+        return 0
+
+    def close(self):
+        pass
+
+def new_checkpoint(args):
+    """Fresh state; the run settings are stored so a resume can check they haven't changed."""
+    return {
+        "input": os.path.abspath(args.input),
+        "input_size": os.path.getsize(args.input),
+        "chunk_size": args.chunk_size,
+        "format": args.format,
+        "chunks_done": 0, "rows_done": 0, "rows_failed": 0, "offset": 0,
+    }
+
+def load_checkpoint(path, args):
+    fresh = new_checkpoint(args)
+    if not os.path.exists(path):
+        return fresh
+    with open(path) as f:
+        state = json.load(f)
+    for key in ("input", "input_size", "chunk_size", "format"):
+        if state.get(key) != fresh[key]:
+            raise ValueError(f"Cannot resume: checkpoint {key}={state.get(key)!r} but this run has {fresh[key]!r}")
+    return state
+
+def save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+# -----------------------------
+# 6️⃣ Driver
+# -----------------------------
+def run(args):
+    checkpoint_path = args.output.rstrip("/\\") + ".progress.json"
+    if args.resume:
+        state = load_checkpoint(checkpoint_path, args)
+    else:
+        state = new_checkpoint(args)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+    if state["chunks_done"]:
+        print(f"↩️ Resuming after chunk {state['chunks_done']} ({state['rows_done']} rows already scored)")
+
+    writer_cls = ParquetWriter if args.format == "parquet" else JsonlWriter
+    writer = writer_cls(args.output, state)
+
+    # Keep at most `max_pending` chunks in flight so memory stays bounded
+    max_pending = args.workers * 2
+    pending = deque()
+    start = time.time()
+    rows_this_run = 0
+
+    def drain_one():
+        nonlocal rows_this_run
+        chunk_no, scored, failed = pending.popleft().result()
+        state["offset"] = writer.write(chunk_no, scored)
+        state["chunks_done"] = chunk_no + 1
+        state["rows_done"] += len(scored)
+        state["rows_failed"] += failed
+        save_checkpoint(checkpoint_path, state)
+        rows_this_run += len(scored)
+        elapsed = max(time.time() - start, 1e-9)
+        print(f"✅ chunk {chunk_no} | {state['rows_done']} rows | {state['rows_failed']} invalid"
+              f" | {rows_this_run / elapsed:,.0f} rows/s", flush=True)
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.models_dir, args.data_dir)) as pool:
+        for chunk_no, chunk in read_chunks(args.input, args.chunk_size, state["rows_done"], state["chunks_done"]):
+            pending.append(pool.submit(score_chunk, chunk_no, chunk))
+            if len(pending) >= max_pending:
+                drain_one()
+        while pending:
+            drain_one()
+
+    writer.close()
+    elapsed = time.time() - start
+    print(f"\n🏁 Scored {rows_this_run} rows in {elapsed:.1f}s → {args.output}")
+    if state["rows_failed"]:
+        print(f"⚠️ {state['rows_failed']} rows had invalid input; see the `error` field")
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Bulk-score a CSV/JSONL of points with the flood & cyclone models.")
+    p.add_argument("input", help="Input .csv or .jsonl file")
+    p.add_argument("output", help="Output .jsonl file, or directory for --format parquet")
+    p.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    p.add_argument("--chunk-size", type=int, default=50_000)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--resume", action="store_true", help="Continue from the last completed chunk")
+    p.add_argument("--models-dir", default="models")
+    p.add_argument("--data-dir", default="data")
+    return p.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("❌ Parquet output needs pyarrow: pip install pyarrow")
+    try:
+        run(args)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
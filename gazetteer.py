@@ -0,0 +1,49 @@
+import bisect, csv
+
+# ------------------------
+# Local gazetteer of Indian places
+# ------------------------
+# Names are kept in one sorted list of normalised keys, so both prefix
+# autocomplete and exact lookups are a bisect into that list.
+
+def normalize(name):
+    return " ".join(name.strip().lower().split())
+
+def grid_cell(lat, lon, size=0.1):
+    """Snap coordinates to a grid cell so nearby lookups share a cache entry."""
+    return (round(round(lat / size) * size, 4), round(round(lon / size) * size, 4))
+
+class Gazetteer:
+    def __init__(self, path):
+        rows = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                rows.append((normalize(row["name"]), {
+                    "name": row["name"],
+                    "state": row["state"],
+                    "lat": float(row["lat"]),
+                    "lon": float(row["lon"]),
+                }))
+        rows.sort(key=lambda r: r[0])
+        self.keys = [k for k, _ in rows]
+        self.places = [p for _, p in rows]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def complete(self, prefix, limit=10):
+        """Return up to `limit` places whose name starts with `prefix`."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_right(self.keys, prefix + "\uffff", lo=start)
+        return self.places[start:min(end, start + limit)]
+
+    def resolve(self, name):
+        """Exact (case-insensitive) name → place, or None if unknown."""
+        key = normalize(name)
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.places[i]
+        return None
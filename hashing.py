@@ -0,0 +1,115 @@
+import threading, time
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# ------------------------
+# Bounded bcrypt pool
+# ------------------------
+# Password hashing runs on its own small thread pool (bcrypt releases the GIL).
+# The calling request thread still waits for its hash, so admission is capped
+# strictly below the number of request threads: an auth burst is turned away
+# with HashPoolBusy while the remaining threads keep serving /predict.
+# The pool and the rate limiter below are per process, so with several
+# gunicorn workers every limit applies to each worker separately.
+
+class HashPoolBusy(Exception):
+    """Raised when the pool is full or a hash did not finish in time."""
+
+class HashPool:
+    def __init__(self, bcrypt, request_threads, workers=2, queue_size=1, timeout=2.0):
+        self.bcrypt = bcrypt
+        self.timeout = timeout
+        # Admission control: running + queued jobs never reach request_threads
+        self.max_inflight = max(1, min(workers + queue_size, request_threads - 1))
+        self.workers = min(workers, self.max_inflight)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self.slots = threading.BoundedSemaphore(self.max_inflight)
+        self.lock = threading.Lock()
+        self.queue_waits = deque(maxlen=1000)
+        self.hash_times = deque(maxlen=1000)
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _run(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise HashPoolBusy("Password hashing queue is full")
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                with self.lock:
+                    self.queue_waits.append(started - submitted)
+                    self.hash_times.append(time.perf_counter() - started)
+                self.slots.release()
+
+        future = self.executor.submit(job)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # A job that never started won't release its own slot
+            if future.cancel():
+                self.slots.release()
+            with self.lock:
+                self.timed_out += 1
+            raise HashPoolBusy("Password hashing timed out")
+
+    def generate(self, password):
+        return self._run(self.bcrypt.generate_password_hash, password).decode('utf-8')
+
+    def check(self, pw_hash, password):
+        return self._run(self.bcrypt.check_password_hash, pw_hash, password)
+
+    def stats(self):
+        with self.lock:
+            result = {
+                "max_inflight": self.max_inflight,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "count": len(self.hash_times),
+            }
+            hash_times = sorted(self.hash_times)
+            queue_waits = sorted(self.queue_waits)
+        if hash_times:
+            result["hash_ms"] = summarize(hash_times)
+            result["queue_wait_ms"] = summarize(queue_waits)
+        return result
+
+def summarize(samples):
+    """avg/p50/p95/max in milliseconds for a sorted list of durations in seconds."""
+    return {
+        "avg": round(sum(samples) / len(samples) * 1000, 1),
+        "p50": round(samples[len(samples) // 2] * 1000, 1),
+        "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+        "max": round(samples[-1] * 1000, 1),
+    }
+
+# ------------------------
+# Per-IP rate limiting
+# ------------------------
+class RateLimiter:
+    """Sliding-window limit of `limit` attempts per `window` seconds per key."""
+    def __init__(self, limit=10, window=60):
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.hits = defaultdict(deque)
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self.lock:
+            hits = self.hits[key]
+            while hits and now - hits[0] > self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return False
+            hits.append(now)
+            # Drop idle keys so the table doesn't grow without bound
+            if len(self.hits) > 10000:
+                for k in [k for k, v in self.hits.items() if not v or now - v[-1] > self.window]:
+                    del self.hits[k]
+            return True